@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """Command line utility for generating suites for targeting antithesis."""
 
+import concurrent.futures
+import functools
+import os
 import os.path
 import sys
 import pathlib
@@ -12,28 +15,39 @@ import yaml
 if __name__ == "__main__" and __package__ is None:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-SUITE_BLACKLIST = [
+# Prefer the libyaml-backed safe loader/dumper, falling back to pure Python if unavailable.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+SUITE_BLACKLIST = frozenset({
     "CheckReplDBHash",
     "CheckReplOplogs",
     "CleanEveryN",
     "ContinuousStepdown",
-]
+})
 
 
 def _sanitize_hooks(hooks):
     if len(hooks) == 0:
         return hooks
     # it's either a list of strings, or a list of dicts, each with key 'class'
-    if isinstance(hooks[0], str):
-        return list(filter(lambda x: x not in SUITE_BLACKLIST, hooks))
-    elif isinstance(hooks[0], dict):
-        return list(filter(lambda x: x['class'] not in SUITE_BLACKLIST, hooks))
-    else:
+    if not isinstance(hooks[0], (str, dict)):
         raise RuntimeError('Unknown structure in hook. File a TIG ticket.')
+    return [
+        hook for hook in hooks
+        if (hook if isinstance(hook, str) else hook['class']) not in SUITE_BLACKLIST
+    ]
 
 
 _SUITES_PATH = os.path.join("buildscripts", "resmokeconfig", "suites")
 
+# Locations within a suite that may hold a list of hooks to sanitize.
+_HOOKS_PATHS = [
+    ("archive", "hooks"),
+    ("executor", "archive", "hooks"),
+    ("executor", "hooks"),
+]
+
 
 @click.group()
 def cli():
@@ -41,58 +55,62 @@ def cli():
     pass
 
 
-def _generate(suite_name: str) -> None:
-    with open(os.path.join(_SUITES_PATH, "{}.yml".format(suite_name))) as fstream:
-        suite = yaml.safe_load(fstream)
-
-    try:
-        suite["archive"]["hooks"] = _sanitize_hooks(suite["archive"]["hooks"])
-    except KeyError:
-        # pass, don't care
-        pass
-    except TypeError:
-        pass
-
-    try:
-        suite["executor"]["archive"]["hooks"] = _sanitize_hooks(
-            suite["executor"]["archive"]["hooks"])
-    except KeyError:
-        # pass, don't care
-        pass
-    except TypeError:
-        pass
-
-    try:
-        suite["executor"]["hooks"] = _sanitize_hooks(suite["executor"]["hooks"])
-    except KeyError:
-        # pass, don't care
-        pass
-    except TypeError:
-        pass
-
-    out = yaml.dump(suite)
-    with open(os.path.join(_SUITES_PATH, "antithesis_{}.yml".format(suite_name)), "w") as fstream:
-        fstream.write(
-            "# this file was generated by buildscripts/antithesis_suite.py generate {}\n".format(
-                suite_name))
-        fstream.write("# Do not modify by hand\n")
-        fstream.write(out)
+def _generate(suite_name: str, source_path: str, target_path: str, force: bool = True) -> None:
+    if not force and os.path.exists(target_path):
+        if os.stat(target_path).st_mtime >= os.stat(source_path).st_mtime:
+            return
+
+    with open(source_path) as fstream:
+        suite = yaml.load(fstream, Loader=_YAML_LOADER)
+
+    for path in _HOOKS_PATHS:
+        node = suite
+        for key in path[:-1]:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, dict) and isinstance(node.get(path[-1]), list):
+            node[path[-1]] = _sanitize_hooks(node[path[-1]])
+
+    header = ("# this file was generated by buildscripts/antithesis_suite.py generate {}\n"
+              "# Do not modify by hand\n").format(suite_name)
+    with open(target_path, "w", buffering=1 << 16) as fstream:
+        fstream.write(header)
+        yaml.dump(suite, fstream, Dumper=_YAML_DUMPER)
 
 
 @cli.command()
 @click.argument('suite_name')
 def generate(suite_name: str) -> None:
     """Generate a single suite."""
-    _generate(suite_name)
+    _generate(suite_name, os.path.join(_SUITES_PATH, "{}.yml".format(suite_name)),
+              os.path.join(_SUITES_PATH, "antithesis_{}.yml".format(suite_name)))
 
 
 @cli.command('generate-all')
-def generate_all():
-    """Generate all suites."""
-    for path in os.listdir(_SUITES_PATH):
-        if os.path.isfile(os.path.join(_SUITES_PATH, path)):
-            suite = path.split(".")[0]
-            _generate(suite)
+@click.option('--force', is_flag=True, default=False,
+              help="Regenerate suites even if they are newer than their source suite.")
+@click.option('--jobs', type=click.IntRange(min=1), default=None,
+              help="Number of suites to generate in parallel. Defaults to the number of CPUs.")
+def generate_all(force: bool, jobs: int) -> None:
+    """Generate all suites that are out of date."""
+    suite_names = []
+    source_paths = []
+    target_paths = []
+    with os.scandir(_SUITES_PATH) as entries:
+        for entry in entries:
+            # Skip previously generated suites, which may be rewritten concurrently below.
+            if entry.name.startswith("antithesis_"):
+                continue
+            if entry.is_file() and entry.name.endswith(".yml"):
+                suite_names.append(entry.name[:-len(".yml")])
+                source_paths.append(entry.path)
+                target_paths.append(os.path.join(_SUITES_PATH, "antithesis_" + entry.name))
+
+    # Each suite is read, sanitized and written independently, so fan out across processes.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        list(
+            executor.map(
+                functools.partial(_generate, force=force), suite_names, source_paths,
+                target_paths))
 
 
 if __name__ == "__main__":
@@ -27,6 +27,8 @@
 # OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
 # ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
+import os
+
 
 class WTPerfConfig:
     def __init__(self,
@@ -46,6 +48,7 @@ class WTPerfConfig:
         self.wtperf_path: str = wtperf_path
         self.home_dir: str = home_dir
         self.test: str = test
+        self.test_name: str = os.path.basename(test)
         self.batch_file = batch_file
         self.arguments = arguments
         self.operations = operations
@@ -29,12 +29,15 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 
 import argparse
+import functools
+import itertools
 import os.path
 import platform
 import psutil
 import subprocess
 import sys
 import json
+from collections import Counter
 from perf_stat import PerfStat
 from perf_stat_collection import PerfStatCollection
 from pygit2 import discover_repository, Repository
@@ -42,19 +45,27 @@ from pygit2 import GIT_SORT_NONE
 from typing import Dict, List, Tuple
 from wtperf_config import WTPerfConfig
 
+# System information is constant for the lifetime of a run, so gather it once.
+_SYSTEM_INFO = {
+    'cpu_physical_cores': psutil.cpu_count(logical=False),
+    'cpu_logical_cores': psutil.cpu_count(),
+    'total_physical_memory_gb': psutil.virtual_memory().total / (1 << 30),
+    'platform': platform.platform()
+}
+
 
 def create_test_home_path(home: str, test_run: int, index:int):
     home_path = "{}_{}_{}".format(home, index, test_run)
     return home_path
 
 
+@functools.lru_cache(maxsize=1)
 def get_git_info(git_working_tree_dir):
     repository_path = discover_repository(git_working_tree_dir)
     assert repository_path is not None
 
     repo = Repository(repository_path)
-    commits = list(repo.walk(repo.head.target, GIT_SORT_NONE))
-    head_commit = commits[0]
+    head_commit = repo[repo.head.target]
     diff = repo.diff()
 
     git_info = {
@@ -69,7 +80,7 @@ def get_git_info(git_working_tree_dir):
         'stats': {
             'files_changed': diff.stats.files_changed,
         },
-        'num_commits': len(commits)
+        'num_commits': sum(1 for _ in repo.walk(repo.head.target, GIT_SORT_NONE))
     }
 
     return git_info
@@ -100,7 +111,7 @@ def to_value_list(reported_stats: List[PerfStat], brief: bool):
 def brief_perf_stats(config: WTPerfConfig, reported_stats: List[PerfStat]):
     as_list = [{
         "info": {
-            "test_name": os.path.basename(config.test)
+            "test_name": config.test_name
         },
         "metrics": to_value_list(reported_stats, brief=True)
     }]
@@ -108,17 +119,11 @@ def brief_perf_stats(config: WTPerfConfig, reported_stats: List[PerfStat]):
 
 
 def detailed_perf_stats(config: WTPerfConfig, reported_stats: List[PerfStat]):
-    total_memory_gb = psutil.virtual_memory().total / (1024 * 1024 * 1024)
     as_dict = {
-                'Test Name': os.path.basename(config.test),
+                'Test Name': config.test_name,
                 'config': config.to_value_dict(),
                 'metrics': to_value_list(reported_stats, brief=False),
-                'system': {
-                   'cpu_physical_cores': psutil.cpu_count(logical=False),
-                   'cpu_logical_cores': psutil.cpu_count(),
-                   'total_physical_memory_gb': total_memory_gb,
-                   'platform': platform.platform()
-                }
+                'system': _SYSTEM_INFO
             }
 
     if config.git_root:
@@ -127,11 +132,22 @@ def detailed_perf_stats(config: WTPerfConfig, reported_stats: List[PerfStat]):
     return as_dict
 
 
-def run_test_wrapper(config: WTPerfConfig, index: int = 0, arguments: List[str] = None):
+def run_and_collect(config: WTPerfConfig,
+                    perf_stats: PerfStatCollection,
+                    index: int = 0,
+                    arguments: List[str] = None,
+                    reuse: bool = False) -> List[PerfStat]:
     for test_run in range(config.run_max):
-        print("Starting test  {}".format(test_run))
-        run_test(config=config, test_run=test_run, index=index, arguments=arguments)
-        print("Completed test {}".format(test_run))
+        if not reuse:
+            print("Starting test  {}".format(test_run))
+            run_test(config=config, test_run=test_run, index=index, arguments=arguments)
+            print("Completed test {}".format(test_run))
+        # Read the stats straight after each run, while its output files are still warm in the page cache.
+        test_home = create_test_home_path(home=config.home_dir, test_run=test_run, index=index)
+        if config.verbose:
+            print('Reading stats from {} directory.'.format(test_home))
+        perf_stats.find_stats(test_home=test_home)
+    return perf_stats.to_report
 
 
 def run_test(config: WTPerfConfig, test_run: int, index: int = 0, arguments: List[str] = None):
@@ -145,22 +161,14 @@ def run_test(config: WTPerfConfig, test_run: int, index: int = 0, arguments: Lis
         test=config.test,
         home=test_home)
     try:
-        subprocess.run(command_line, check=True, stderr=subprocess.STDOUT, stdout=subprocess.PIPE,
+        # Only stderr is kept: buffering a long run's stdout in memory just to discard it is wasteful.
+        subprocess.run(command_line, check=True, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
                        universal_newlines=True)
     except subprocess.CalledProcessError as cpe:
-        print("Error: {}".format(cpe.output))
+        print("Error: {}".format(cpe.stderr))
         exit(1)
 
 
-def process_results(config: WTPerfConfig, perf_stats: PerfStatCollection, index: int = 0) -> List[PerfStat]:
-    for test_run in range(config.run_max):
-        test_home = create_test_home_path(home=config.home_dir, test_run=test_run, index=index)
-        if config.verbose:
-            print('Reading stats from {} directory.'.format(test_home))
-        perf_stats.find_stats(test_home=test_home)
-    return perf_stats.to_report
-
-
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument('-p', '--wtperf', help='path of the wtperf executable')
@@ -183,22 +191,24 @@ def parse_args() -> argparse.Namespace:
     args = parser.parse_args()
 
     if args.verbose:
-        print('WTPerfPy')
-        print('========')
-        print("Configuration:")
-        print("  WtPerf path:       {}".format(args.wtperf))
-        print("  Environment:       {}".format(args.env))
-        print("  Test path:         {}".format(args.test))
-        print("  Home base:         {}".format(args.home))
-        print("  Batch file:        {}".format(args.batch_file))
-        print("  Arguments:         {}".format(args.arguments))
-        print("  Operations:        {}".format(args.operations))
-        print("  Git root:          {}".format(args.git_root))
-        print("  Outfile:           {}".format(args.outfile))
-        print("  Runmax:            {}".format(args.runmax))
-        print("  JSON info          {}".format(args.json_info))
-        print("  Reuse results:     {}".format(args.reuse))
-        print("  Brief output:      {}".format(args.brief_output))
+        print("\n".join([
+            "WTPerfPy",
+            "========",
+            "Configuration:",
+            f"  WtPerf path:       {args.wtperf}",
+            f"  Environment:       {args.env}",
+            f"  Test path:         {args.test}",
+            f"  Home base:         {args.home}",
+            f"  Batch file:        {args.batch_file}",
+            f"  Arguments:         {args.arguments}",
+            f"  Operations:        {args.operations}",
+            f"  Git root:          {args.git_root}",
+            f"  Outfile:           {args.outfile}",
+            f"  Runmax:            {args.runmax}",
+            f"  JSON info          {args.json_info}",
+            f"  Reuse results:     {args.reuse}",
+            f"  Brief output:      {args.brief_output}",
+        ]))
 
     if args.wtperf is None:
         sys.exit('The path to the wtperf executable is required')
@@ -245,21 +255,18 @@ def parse_json_args(args: argparse.Namespace) -> Tuple[List[str], List[str], WTP
 def validate_operations(config: WTPerfConfig, batch_file_contents: Dict, operations: List[str]):
     # Check for duplicate operations, and exit if duplicates are found
     # First, construct a list of all operations, including potential duplicates
-    all_operations = []
     if config.batch_file:
-        for content in batch_file_contents:
-            all_operations += content["operations"]
-    elif operations:
-        all_operations += operations
-    # Next, construct a new list with duplicates removed.
-    # Converting to a dict and back is a simple way of doing this.
-    all_operations_nodups = list(dict.fromkeys(all_operations))
-    # Now check if any duplicate operations were removed in the deduplication step.
-    if len(all_operations_nodups) != len(all_operations):
-        sys.exit("List of all operations ({}) contains duplicates".format(all_operations))
+        all_operations = list(itertools.chain.from_iterable(
+            content["operations"] for content in batch_file_contents))
+    else:
+        all_operations = list(operations or [])
+    # Next, check if any operation appears more than once.
+    if len(set(all_operations)) != len(all_operations):
+        duplicates = [oper for oper, count in Counter(all_operations).items() if count > 1]
+        sys.exit("List of all operations ({}) contains duplicates: {}".format(all_operations, duplicates))
 
     # Also check that all operations provided have an associated PerfStat.
-    all_stat_names = [stat.short_label for stat in PerfStatCollection.all_stats()]
+    all_stat_names = frozenset(stat.short_label for stat in PerfStatCollection.all_stats())
     for oper in all_operations:
         if oper not in all_stat_names:
             sys.exit(f"Provided operation '{oper}' does not match any known PerfStats.\n"
@@ -275,20 +282,23 @@ def run_perf_tests(config: WTPerfConfig,
     if config.batch_file:
         if args.verbose:
             print("Batch tests to run: {}".format(len(batch_file_contents)))
-        for content in batch_file_contents:
-            index = batch_file_contents.index(content)
+        for index, content in enumerate(batch_file_contents):
             if args.verbose:
                 print("Batch test {}: Arguments: {}, Operations: {}".
                         format(index,  content["arguments"], content["operations"]))
-                perf_stats = PerfStatCollection(content["operations"])
-                if not args.reuse:
-                    run_test_wrapper(config=config, index=index, arguments=content["arguments"])
-                reported_stats += process_results(config, perf_stats, index=index)
+            perf_stats = PerfStatCollection(content["operations"])
+            reported_stats += run_and_collect(config=config,
+                                              perf_stats=perf_stats,
+                                              index=index,
+                                              arguments=content["arguments"],
+                                              reuse=args.reuse)
     else:
         perf_stats = PerfStatCollection(operations)
-        if not args.reuse:
-            run_test_wrapper(config=config, index=0, arguments=arguments)
-        reported_stats = process_results(config, perf_stats)
+        reported_stats = run_and_collect(config=config,
+                                         perf_stats=perf_stats,
+                                         index=0,
+                                         arguments=arguments,
+                                         reuse=args.reuse)
 
     return reported_stats
 
@@ -302,16 +312,21 @@ def report_results(args: argparse.Namespace, config: WTPerfConfig, reported_stat
             print("Detailed stats output (Atlas compatible format):")
         perf_results = detailed_perf_stats(config, reported_stats)
 
+    # Only pretty-print for a human reader; the outfile is consumed by Evergreen/Atlas parsers.
+    perf_json = None
     if args.verbose:
         perf_json = json.dumps(perf_results, indent=4, sort_keys=True)
-        print("{}".format(perf_json))
+        print(perf_json)
 
     if args.outfile:
         dir_name = os.path.dirname(args.outfile)
         if dir_name:
             os.makedirs(dir_name, exist_ok=True)
         with open(args.outfile, 'w') as outfile:
-            json.dump(perf_results, outfile, indent=4, sort_keys=True)
+            if perf_json is not None:
+                outfile.write(perf_json)
+            else:
+                json.dump(perf_results, outfile)
 
 def main():
     args = parse_args()